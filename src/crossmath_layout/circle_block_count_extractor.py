@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Tuple
 from enum import Enum
 
 from crossmath_layout.models import RowCol, Size, Direction
@@ -25,18 +25,23 @@ class ExtractArg:
 
 class CircleBlockCountExtractor:
     def __init__(self):
-        pass
+        # (height, width) -> 提取参数，参数只依赖盘面尺寸，每个尺寸只构建一次
+        self._outer_circle_extract_args: Dict[Tuple[int, int], List[ExtractArg]] = {}
+        self._second_outer_circle_extract_args: Dict[Tuple[int, int], List[ExtractArg]] = {}
 
     def cal_outer_circle_block_count(self,layout_info: str, height: int, width: int) -> OuterCircleBlockCount:
         """
         计算最外圈用到的格子数
         """
-        extract_args = [
-            ExtractArg(RowCol(0, 0), width, Direction.HORIZONTAL),
-            ExtractArg(RowCol(height - 1, 0), width, Direction.HORIZONTAL),
-            ExtractArg(RowCol(0, 0), height, Direction.VERTICAL),
-            ExtractArg(RowCol(0, width - 1), height, Direction.VERTICAL),
-        ]
+        extract_args = self._outer_circle_extract_args.get((height, width))
+        if extract_args is None:
+            extract_args = [
+                ExtractArg(RowCol(0, 0), width, Direction.HORIZONTAL),
+                ExtractArg(RowCol(height - 1, 0), width, Direction.HORIZONTAL),
+                ExtractArg(RowCol(0, 0), height, Direction.VERTICAL),
+                ExtractArg(RowCol(0, width - 1), height, Direction.VERTICAL),
+            ]
+            self._outer_circle_extract_args[(height, width)] = extract_args
         block_count_list = self.extract(layout_info, height, width, extract_args)
         return OuterCircleBlockCount(block_count_list[0], block_count_list[1], block_count_list[2], block_count_list[3])
 
@@ -44,21 +49,20 @@ class CircleBlockCountExtractor:
         """
         计算次外圈用到的格子数
         """
-        extract_args = [
-            ExtractArg(RowCol(1, 1), width - 2, Direction.HORIZONTAL),
-            ExtractArg(RowCol(height - 2, 1), width - 2, Direction.HORIZONTAL),
-            ExtractArg(RowCol(1, 1), height - 2, Direction.VERTICAL),
-            ExtractArg(RowCol(1, width - 2), height - 2, Direction.VERTICAL),
-        ]
+        extract_args = self._second_outer_circle_extract_args.get((height, width))
+        if extract_args is None:
+            extract_args = [
+                ExtractArg(RowCol(1, 1), width - 2, Direction.HORIZONTAL),
+                ExtractArg(RowCol(height - 2, 1), width - 2, Direction.HORIZONTAL),
+                ExtractArg(RowCol(1, 1), height - 2, Direction.VERTICAL),
+                ExtractArg(RowCol(1, width - 2), height - 2, Direction.VERTICAL),
+            ]
+            self._second_outer_circle_extract_args[(height, width)] = extract_args
         block_count_list = self.extract(layout_info, height, width, extract_args)
         return OuterCircleBlockCount(block_count_list[0], block_count_list[1], block_count_list[2], block_count_list[3])
 
     def extract(self, layout_info: str, height: int, width: int, extract_args: List[ExtractArg]) -> List[int]:
-        block_count_list = []
-        for extract_arg in extract_args:
-            block_count_list.append(self._extract_1_count(layout_info, height, width, extract_arg))
-        
-        return block_count_list
+        return [self._extract_1_count(layout_info, height, width, extract_arg) for extract_arg in extract_args]
 
     
     def _extract_1_count(self, layout_info: str, height: int, width: int, extract_arg: ExtractArg) -> int:
@@ -66,15 +70,20 @@ class CircleBlockCountExtractor:
         count = extract_arg.count
         direction = extract_arg.direction
 
-        coords = []
+        row, col = row_col_coord.row, row_col_coord.col
         if direction == Direction.HORIZONTAL:
-            coords = self.get_horizontal_range_coords(row_col_coord, count, Size(height=height, width=width))
+            end_row, end_col = row, col + count - 1
         else:
-            coords = self.get_vertical_range_coords(row_col_coord, count, Size(height=height, width=width))
-        
-        if not coords:
+            end_row, end_col = row + count - 1, col
+
+        if count < 1 or not (0 <= row < height and 0 <= col < width and 0 <= end_row < height and 0 <= end_col < width):
             raise ValueError(f"coords is None, row_col_coord: {row_col_coord}, count: {count}, direction: {direction}, height: {height}, width: {width} \n layout_info: {layout_info}")
-        return sum(layout_info[coord.row * width + coord.col] == "1" for coord in coords)
+
+        # 同一行的格子在字符串中连续，同一列的格子间隔 width，直接切片计数
+        start = row * width + col
+        if direction == Direction.HORIZONTAL:
+            return layout_info[start:start + count].count("1")
+        return layout_info[start:start + (count - 1) * width + 1:width].count("1")
 
 
     def is_valid_coord(self, coord: RowCol, size_limit: Size):
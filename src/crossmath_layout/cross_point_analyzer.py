@@ -4,14 +4,14 @@
 """
 
 from dataclasses import dataclass
-from typing import Dict, Set, Tuple, Optional
+from typing import Collection, Dict, Set, Tuple, Optional
 from collections import defaultdict
-from enum import Enum
+from enum import IntEnum
 
 from crossmath_layout.models import RowCol
 
 
-class CrossPointType(Enum):
+class CrossPointType(IntEnum):
     """交点类型枚举"""
     NONE = 0
     HEAD = 1    # 起点
@@ -19,7 +19,7 @@ class CrossPointType(Enum):
     TAIL = 3    # 终点
 
 
-class EquationCrossType(Enum):
+class EquationCrossType(IntEnum):
     """算式交叉类型枚举"""
     NONE = 0
     HEAD_TO_HEAD = 1
@@ -35,22 +35,12 @@ class EquationCrossType(Enum):
     @staticmethod
     def is_point_to_point(cross_type: "EquationCrossType") -> bool:
         """判断是否是端点对端点的交叉类型"""
-        return cross_type in [
-            EquationCrossType.HEAD_TO_HEAD,
-            EquationCrossType.TAIL_TO_HEAD,
-            EquationCrossType.HEAD_TO_TAIL,
-            EquationCrossType.TAIL_TO_TAIL
-        ]
+        return cross_type in _POINT_TO_POINT_CROSS_TYPES
 
     @staticmethod
     def is_point_to_middle(cross_type: "EquationCrossType") -> bool:
         """判断是否是端点对中间点的交叉类型"""
-        return cross_type in [
-            EquationCrossType.HEAD_TO_MIDDLE,
-            EquationCrossType.TAIL_TO_MIDDLE,
-            EquationCrossType.MIDDLE_TO_HEAD,
-            EquationCrossType.MIDDLE_TO_TAIL
-        ]
+        return cross_type in _POINT_TO_MIDDLE_CROSS_TYPES
 
     @staticmethod
     def is_middle_to_middle(cross_type: "EquationCrossType") -> bool:
@@ -58,6 +48,23 @@ class EquationCrossType(Enum):
         return cross_type == EquationCrossType.MIDDLE_TO_MIDDLE
 
 
+_POINT_TO_POINT_CROSS_TYPES = frozenset({
+    EquationCrossType.HEAD_TO_HEAD,
+    EquationCrossType.TAIL_TO_HEAD,
+    EquationCrossType.HEAD_TO_TAIL,
+    EquationCrossType.TAIL_TO_TAIL,
+})
+"""端点对端点的交叉类型"""
+
+_POINT_TO_MIDDLE_CROSS_TYPES = frozenset({
+    EquationCrossType.HEAD_TO_MIDDLE,
+    EquationCrossType.TAIL_TO_MIDDLE,
+    EquationCrossType.MIDDLE_TO_HEAD,
+    EquationCrossType.MIDDLE_TO_TAIL,
+})
+"""端点对中间点的交叉类型"""
+
+
 @dataclass
 class CrossPointAnalysisResult:
     """交点分析结果"""
@@ -76,10 +83,22 @@ class CrossPointAnalyzer:
         """
         self.equation_id_to_coords = None
         self.coord_to_equation_ids = None 
+        self.equation_id_to_coord_index: Dict[int, Dict[RowCol, int]] = {}
+        self.all_cross_points: Dict[RowCol, Set[int]] = {}
 
-    def setup(self, equation_id_to_coords: Dict[int, Set[RowCol]]):
+    def setup(self, equation_id_to_coords: Dict[int, Collection[RowCol]], coord_to_equation_ids: Dict[RowCol, Set[int]] | None = None):
+        """
+        :param equation_id_to_coords: 算式ID到坐标的映射，坐标顺序不限（集合或元组均可）
+        :param coord_to_equation_ids: 已构建好的坐标到算式ID的映射（如 EquationLayoutBrief 中的），传入时不再重新构建
+        """
         self.equation_id_to_coords = equation_id_to_coords
-        self._build_coord_to_equation_ids()
+        self.equation_id_to_coord_index = {}
+        if coord_to_equation_ids is None:
+            self._build_coord_to_equation_ids()
+        else:
+            self.coord_to_equation_ids = coord_to_equation_ids
+        self.all_cross_points = {coord: eq_ids for coord, eq_ids in self.coord_to_equation_ids.items()
+                                 if len(eq_ids) > 1}
 
     def _build_coord_to_equation_ids(self):
         """构建坐标到算式ID的映射"""
@@ -89,9 +108,8 @@ class CrossPointAnalyzer:
                 self.coord_to_equation_ids[coord].add(equation_id)
 
     def get_all_cross_points(self) -> Dict[RowCol, Set[int]]:
-        """获取所有交点格子及其对应的算式ID集合"""
-        return {coord: eq_ids for coord, eq_ids in self.coord_to_equation_ids.items() 
-                if len(eq_ids) > 1}
+        """获取所有交点格子及其对应的算式ID集合（setup 时已计算）"""
+        return self.all_cross_points
 
     def analyze_cross_point(self, coord: RowCol) -> Optional[CrossPointAnalysisResult]:
         """
@@ -118,28 +136,48 @@ class CrossPointAnalyzer:
 
     def _get_point_type(self, equation_id: int, coord: RowCol) -> CrossPointType:
         """获取坐标在算式中的位置类型"""
-        sorted_coords = sorted(self.equation_id_to_coords[equation_id])
-        index = sorted_coords.index(coord)
+        coord_index = self._get_coord_index(equation_id)
+        index = coord_index[coord]
 
         if index == 0:
             return CrossPointType.HEAD
-        elif index == len(sorted_coords) - 1:
+        elif index == len(coord_index) - 1:
             return CrossPointType.TAIL
         elif index == 2:  # 假设中间点是第三个点
             return CrossPointType.MIDDLE
         return CrossPointType.NONE
 
+    def _get_coord_index(self, equation_id: int) -> Dict[RowCol, int]:
+        """获取算式中每个坐标的位置下标（按坐标排序，不依赖传入的顺序），每个算式只排序一次"""
+        coord_index = self.equation_id_to_coord_index.get(equation_id)
+        if coord_index is None:
+            coord_index = {coord: index for index, coord in enumerate(sorted(self.equation_id_to_coords[equation_id]))}
+            self.equation_id_to_coord_index[equation_id] = coord_index
+        return coord_index
+
     def _determine_cross_type(self, type1: CrossPointType, type2: CrossPointType) -> EquationCrossType:
         """根据两个点的类型确定交叉类型"""
-        cross_type_map = {
-            (CrossPointType.HEAD, CrossPointType.HEAD): EquationCrossType.HEAD_TO_HEAD,
-            (CrossPointType.HEAD, CrossPointType.MIDDLE): EquationCrossType.HEAD_TO_MIDDLE,
-            (CrossPointType.HEAD, CrossPointType.TAIL): EquationCrossType.HEAD_TO_TAIL,
-            (CrossPointType.TAIL, CrossPointType.HEAD): EquationCrossType.TAIL_TO_HEAD,
-            (CrossPointType.TAIL, CrossPointType.MIDDLE): EquationCrossType.TAIL_TO_MIDDLE,
-            (CrossPointType.TAIL, CrossPointType.TAIL): EquationCrossType.TAIL_TO_TAIL,
-            (CrossPointType.MIDDLE, CrossPointType.HEAD): EquationCrossType.MIDDLE_TO_HEAD,
-            (CrossPointType.MIDDLE, CrossPointType.MIDDLE): EquationCrossType.MIDDLE_TO_MIDDLE,
-            (CrossPointType.MIDDLE, CrossPointType.TAIL): EquationCrossType.MIDDLE_TO_TAIL,
-        }
-        return cross_type_map.get((type1, type2), EquationCrossType.NONE)
\ No newline at end of file
+        return _CROSS_TYPE_TABLE[type1 * _POINT_TYPE_COUNT + type2]
+
+
+def _build_cross_type_table() -> Tuple[EquationCrossType, ...]:
+    """构建 (交点类型1, 交点类型2) -> 算式交叉类型 的查找表, 以 type1 * 4 + type2 为下标"""
+    cross_type_map = {
+        (CrossPointType.HEAD, CrossPointType.HEAD): EquationCrossType.HEAD_TO_HEAD,
+        (CrossPointType.HEAD, CrossPointType.MIDDLE): EquationCrossType.HEAD_TO_MIDDLE,
+        (CrossPointType.HEAD, CrossPointType.TAIL): EquationCrossType.HEAD_TO_TAIL,
+        (CrossPointType.TAIL, CrossPointType.HEAD): EquationCrossType.TAIL_TO_HEAD,
+        (CrossPointType.TAIL, CrossPointType.MIDDLE): EquationCrossType.TAIL_TO_MIDDLE,
+        (CrossPointType.TAIL, CrossPointType.TAIL): EquationCrossType.TAIL_TO_TAIL,
+        (CrossPointType.MIDDLE, CrossPointType.HEAD): EquationCrossType.MIDDLE_TO_HEAD,
+        (CrossPointType.MIDDLE, CrossPointType.MIDDLE): EquationCrossType.MIDDLE_TO_MIDDLE,
+        (CrossPointType.MIDDLE, CrossPointType.TAIL): EquationCrossType.MIDDLE_TO_TAIL,
+    }
+    table = [EquationCrossType.NONE] * (_POINT_TYPE_COUNT * _POINT_TYPE_COUNT)
+    for (type1, type2), cross_type in cross_type_map.items():
+        table[type1 * _POINT_TYPE_COUNT + type2] = cross_type
+    return tuple(table)
+
+
+_POINT_TYPE_COUNT = len(CrossPointType)
+_CROSS_TYPE_TABLE = _build_cross_type_table()
@@ -1,4 +1,5 @@
-from typing import Dict, Set, List
+from itertools import compress
+from typing import Dict, Set, List, Tuple
 from crossmath_layout.models import RowCol, Size, EquationLayoutBrief
 
 class EquationLayoutBriefBuilder:
@@ -8,23 +9,38 @@ class EquationLayoutBriefBuilder:
         self.height = None 
         self.equation_length = equation_length
 
+        # (width, height) -> 按扫描顺序排列的所有横向/纵向算式窗口坐标
+        self._equation_windows: Dict[Tuple[int, int], List[Tuple[int, int, Tuple[RowCol, ...]]]] = {}
+        # (width, height) -> 按行优先排列的全部格子坐标
+        self._cells: Dict[Tuple[int, int], List[RowCol]] = {}
+        # (row, col) -> RowCol, 同一坐标在所有盘面与窗口中共用同一个对象
+        self._rowcol_pool: Dict[Tuple[int, int], RowCol] = {}
+
     def build_by_layout(self, layout_info: str, width: int, height: int) -> EquationLayoutBrief | None:
         """根据布局信息构建EquationLayoutBrief"""
         width = width or self.width
         height = height or self.height
         equation_length = self.equation_length
+        equation_ones = "1" * equation_length
 
         if (width is None) or (height is None) or (layout_info is None) or (len(layout_info) != (width * height)):
             return None 
 
-        def update(coords: List[RowCol], equation_id: int, equation_id_to_coords: Dict[int, Set[RowCol]], coord_to_equation_ids: Dict[RowCol, Set[int]]):
+        def update(start: int, step: int, coords: Tuple[RowCol, ...], equation_id: int, equation_id_to_coords: Dict[int, Tuple[RowCol, ...]]):
             if not coords:
                 return False
 
-            if all(value == "1" for value in map(lambda coord: layout_info[coord.row * width + coord.col], coords)):
-                equation_id_to_coords[equation_id] = set(coords)
-                for coord in coords:
-                    coord_to_equation_ids[coord].add(equation_id)
+            # 窗口内的格子在字符串中等间隔分布，一次切片比较即可判断是否全为1
+            if layout_info[start:start + equation_length * step:step] == equation_ones:
+                # 窗口坐标按尺寸缓存且不可变，直接共享，无需为每个算式复制
+                equation_id_to_coords[equation_id] = coords
+                # 按格子下标分组记录算式ID，避免逐坐标哈希
+                for index in range(start, start + equation_length * step, step):
+                    equation_ids = equation_ids_by_cell[index]
+                    if equation_ids is None:
+                        equation_ids_by_cell[index] = {equation_id}
+                    else:
+                        equation_ids.add(equation_id)
                 return True
 
             return False
@@ -33,23 +49,50 @@ class EquationLayoutBriefBuilder:
         equation_layout_brief = EquationLayoutBrief(layout_info=layout_info, size=size_limit, all_valid_coords=self.get_all_valid_coords(layout_info, size_limit))
 
         equation_id_to_coords = equation_layout_brief.equation_id_to_coords
-        coord_to_equation_ids = equation_layout_brief.coord_to_equation_ids
+        equation_ids_by_cell: List[Set[int] | None] = [None] * (width * height)
 
         current_equation_id = 1
+        for start, step, equation_coords in self.get_equation_windows(size_limit):
+            if update(start, step, equation_coords, current_equation_id, equation_id_to_coords):
+                current_equation_id += 1
+
+        # 扫描结束后一次性把分组结果写入坐标映射
+        equation_layout_brief.coord_to_equation_ids.update(
+            (cell, equation_ids)
+            for cell, equation_ids in zip(self.get_all_cells(size_limit), equation_ids_by_cell)
+            if equation_ids is not None
+        )
+
+        return equation_layout_brief
+    
+    def get_equation_windows(self, size_limit: Size) -> List[Tuple[int, int, Tuple[RowCol, ...]]]:
+        """
+        获取盘面内所有可能的算式窗口, 按行优先、先横后纵的顺序排列, 按尺寸缓存
+        :return: (起点在字符串中的下标, 步长, 窗口坐标) 列表
+        """
+        key = (size_limit.width, size_limit.height)
+        equation_windows = self._equation_windows.get(key)
+        if equation_windows is not None:
+            return equation_windows
+
+        width, height = size_limit.width, size_limit.height
+        equation_length = self.equation_length
+        cells = self.get_all_cells(size_limit)
+
+        equation_windows = []
         for row in range(height):
             for col in range(width):
-                start_coord = RowCol(row, col)
+                start = row * width + col
                 # 横向算式收集
-                if (horizontal_equation_coords := self.get_horizontal_range_coords(start_coord, equation_length, size_limit)):
-                    if update(horizontal_equation_coords, current_equation_id, equation_id_to_coords, coord_to_equation_ids):
-                        current_equation_id += 1
+                if col + equation_length <= width:
+                    equation_windows.append((start, 1, tuple(cells[start:start + equation_length])))
                 # 纵向算式收集
-                if (vertical_equation_coords := self.get_vertical_range_coords(start_coord, equation_length, size_limit)):
-                    if update(vertical_equation_coords, current_equation_id, equation_id_to_coords, coord_to_equation_ids):
-                        current_equation_id += 1
+                if row + equation_length <= height:
+                    equation_windows.append((start, width, tuple(cells[start:start + equation_length * width:width])))
+
+        self._equation_windows[key] = equation_windows
+        return equation_windows
 
-        return equation_layout_brief
-    
     def is_valid_coord(self, coord: RowCol, size_limit: Size):
         """检查坐标是否有效"""
         return (0 <= coord.row < size_limit.height) and (0 <= coord.col < size_limit.width)
@@ -84,9 +127,25 @@ class EquationLayoutBriefBuilder:
         if not layout_info or len(layout_info) != size_limit.width * size_limit.height:
             return []
     
-        return [
-            RowCol(row, col)
-            for row in range(size_limit.height)
-            for col in range(size_limit.width)
-            if layout_info[row * size_limit.width + col] == "1"
-        ]
+        # 逐字符比较与筛选都在 C 层完成，不再逐格计算下标
+        return list(compress(self.get_all_cells(size_limit), map("1".__eq__, layout_info)))
+
+    def get_all_cells(self, size_limit: Size) -> List[RowCol]:
+        """获取盘面全部格子坐标（行优先），按尺寸缓存"""
+        key = (size_limit.width, size_limit.height)
+        cells = self._cells.get(key)
+        if cells is None:
+            cells = [
+                self.get_rowcol(row, col)
+                for row in range(size_limit.height)
+                for col in range(size_limit.width)
+            ]
+            self._cells[key] = cells
+        return cells
+
+    def get_rowcol(self, row: int, col: int) -> RowCol:
+        """获取驻留的 RowCol 对象，相同坐标始终返回同一个实例"""
+        rowcol = self._rowcol_pool.get((row, col))
+        if rowcol is None:
+            rowcol = self._rowcol_pool[(row, col)] = RowCol(row, col)
+        return rowcol
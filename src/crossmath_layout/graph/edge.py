@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Edge:
     """
     边
@@ -10,8 +10,8 @@
 """
 
 from dataclasses import dataclass
-from typing import Dict, Set
-from collections import defaultdict, deque
+from typing import Dict, List, Set, Tuple
+from collections import defaultdict
 
 from crossmath_layout.equation_layout_builder import EquationLayoutBriefBuilder
 from crossmath_layout.circle_block_count_extractor import CircleBlockCountExtractor
@@ -19,6 +19,10 @@ from crossmath_layout.models import RowCol
 from crossmath_layout.cross_point_analyzer import CrossPointAnalyzer, CrossPointAnalysisResult, EquationCrossType
 from crossmath_layout.utils.viewer import print_board
 
+
+_STRIP_0_AND_1 = str.maketrans("", "", "01")
+"""删除所有 0 和 1 的转换表"""
+
 @dataclass
 class LayoutResult:
     is_valid: bool
@@ -34,16 +38,25 @@ class LayoutChecker:
         self.circle_block_count_extractor = CircleBlockCountExtractor()
 
         self.coord_to_equation_ids: Dict[RowCol, Set[int]] = defaultdict(set)
-        self.equation_id_to_coords: Dict[int, Set[RowCol]] = defaultdict(set)
+        self.equation_id_to_coords: Dict[int, Tuple[RowCol, ...]] = {}
 
         self.layout_info: str = None
         self.width: int = None
         self.height: int = None
 
+        # 以下结果只依赖于 setup 时的盘面, 在 setup 中计算或在首次使用时缓存
+        self._one_count: int | None = None
+        self._check_result: LayoutResult | None = None
+
+        # (width, height) -> (首列位掩码, 末列位掩码)，同一尺寸只计算一次
+        self._column_masks: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
     def clear(self):
         self.equation_layout_brief = None
         self.coord_to_equation_ids.clear()
         self.equation_id_to_coords.clear()
+        self._one_count = None
+        self._check_result = None
 
     
     def setup(self, layout_info: str, width: int, height: int) -> bool:
@@ -56,11 +69,17 @@ class LayoutChecker:
         self.layout_info = layout_info
         self.width = width
         self.height = height
+        self._one_count = layout_info.count('1')
 
-        self.cross_point_analyzer.setup(self.equation_id_to_coords)
+        self.cross_point_analyzer.setup(self.equation_id_to_coords, self.coord_to_equation_ids)
         return True
 
     def check(self) -> LayoutResult:
+        if self._check_result is None:
+            self._check_result = self._check()
+        return self._check_result
+
+    def _check(self) -> LayoutResult:
         if not self._check_connected(self.layout_info, self.width, self.height):
             return LayoutResult(is_valid=False, error_message="面板不连通")
         
@@ -75,6 +94,31 @@ class LayoutChecker:
     
         return LayoutResult(is_valid=True, formula_count=len(self.equation_id_to_coords.keys()))
 
+    def check_batch(self, layouts: List[str], width: int, height: int) -> List[LayoutResult]:
+        """
+        批量检查同一尺寸的多个盘面
+        先用长度、最外圈是否有格子这类只需切片的检查过滤整批盘面，
+        只有通过的盘面才构建算式信息并做完整检查。
+        被提前过滤的盘面直接返回对应的不合法结果（不再区分是否同时不连通）
+        """
+        results = []
+        for layout_info in layouts:
+            if len(layout_info) != width * height:
+                results.append(LayoutResult(is_valid=False, error_message="盘面信息长度与尺寸不符"))
+                continue
+
+            # 上下两行、左右两列都至少有一个格子
+            if ("1" not in layout_info[:width] or "1" not in layout_info[-width:]
+                    or "1" not in layout_info[::width] or "1" not in layout_info[width - 1::width]):
+                results.append(LayoutResult(is_valid=False, error_message="盘面尺寸不合法, 最外围有不存在格子"))
+                continue
+
+            if not self.setup(layout_info, width, height):
+                results.append(LayoutResult(is_valid=False, error_message="盘面信息长度与尺寸不符"))
+                continue
+            results.append(self.check())
+        return results
+
     def _check_size(self):
         """
         检查盘面尺寸是否合法
@@ -106,11 +150,8 @@ class LayoutChecker:
         13                    □           □            
         14        □  □  □  □  □     □  □  □  □  □      
         """
-        all_valid_coords = set()
-        for equation_id in self.equation_id_to_coords.keys():
-            all_valid_coords.update(self.equation_id_to_coords[equation_id])
-        
-        if len(all_valid_coords) != self._find_all_one_count(self.layout_info):
+        # coord_to_equation_ids 的键正好是所有算式覆盖到的格子，无需再逐个算式求并集
+        if len(self.coord_to_equation_ids) != self._find_all_one_count(self.layout_info):
             return False
         return True
 
@@ -131,17 +172,24 @@ class LayoutChecker:
 
     def _check_connected(self, layout_info: str, width: int, height: int) -> bool:
         try:
-            connected_ones_count = self._find_and_count_connected_ones(layout_info, width, height)
             all_one_count = self._find_all_one_count(layout_info)
+            # 全0或全1的盘面必然连通，只需做输入合法性检查，无需扩张
+            if all_one_count == 0 or all_one_count == len(layout_info):
+                return len(layout_info) == width * height and self._check_only_0_and_1(layout_info)
+
+            connected_ones_count = self._find_and_count_connected_ones(layout_info, width, height)
             return connected_ones_count == all_one_count
         except Exception as e:
             return False
     
     def _check_only_0_and_1(self, layout_info: str) -> bool:
-        return all(value == "0" or value == "1" for value in layout_info)
+        # 删掉所有 0 和 1 后为空串，说明只由 0 和 1 组成
+        return not layout_info.translate(_STRIP_0_AND_1)
     
         
     def _find_all_one_count(self,layout_info: str) -> int:
+        if layout_info is self.layout_info and self._one_count is not None:
+            return self._one_count
         return layout_info.count('1')
 
     def _find_and_count_connected_ones(self, layout_info: str, width: int, height: int) -> int:
@@ -161,44 +209,40 @@ class LayoutChecker:
         if not self._check_only_0_and_1(layout_info):
             raise ValueError("字符串只能包含0和1")
         
-        # 将字符串转换为矩阵（行优先）
-        matrix = [
-            [int(layout_info[i * width + j]) for j in range(width)]
-            for i in range(height)  
-        ]
-        
-        # 定义4个移动方向（上、下、左、右）
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        
-        # 找到第一个1的位置（行优先遍历）
-        first_one = next(
-            ((i, j) for i in range(height) for j in range(width) if matrix[i][j] == 1),
-            None
-        )
-        
-        if first_one is None:
+        if "1" not in layout_info:
             return 0  # 矩阵中没有1
-        
-        # 使用BFS遍历连通区域
-        visited = [[False for _ in range(width)] for _ in range(height)]
-        queue = deque([first_one])
-        visited[first_one[0]][first_one[1]] = True
-        count = 0
-        
-        while queue:
-            x, y = queue.popleft()
-            count += 1
-            
-            # 检查4个相邻位置
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < height and 0 <= ny < width:
-                    # 检查是否越界
-                    if not visited[nx][ny] and matrix[nx][ny] == 1:
-                        visited[nx][ny] = True
-                        queue.append((nx, ny))
-        
-        return count
+
+        # 直接按二进制解析成位棋盘，不复制字符串：第 i 个格子对应第 n-1-i 位
+        mask = int(layout_info, 2)
+
+        # 左右移位时需要屏蔽跨行的位，首列/末列的格子不能左右越界
+        first_column, last_column = self._get_column_masks(width, height)
+        mask_without_first = mask & ~first_column
+        mask_without_last = mask & ~last_column
+
+        # 从第一个1（行优先，即最高位）开始，整盘并行向上下左右扩张，直到不再变化
+        frontier = 1 << (mask.bit_length() - 1)
+        while True:
+            # 左移一位是向左一格，右移一位是向右一格
+            expanded = (
+                ((frontier | (frontier << width) | (frontier >> width)) & mask)
+                | ((frontier << 1) & mask_without_last)
+                | ((frontier >> 1) & mask_without_first)
+            )
+            if expanded == frontier:
+                break
+            frontier = expanded
+
+        return frontier.bit_count()
+
+    def _get_column_masks(self, width: int, height: int) -> Tuple[int, int]:
+        """获取首列和末列的位掩码（第 i 个格子对应第 n-1-i 位），按尺寸缓存"""
+        column_masks = self._column_masks.get((width, height))
+        if column_masks is None:
+            last_column = sum(1 << (row * width) for row in range(height))
+            column_masks = (last_column << (width - 1), last_column)
+            self._column_masks[(width, height)] = column_masks
+        return column_masks
 
 
 
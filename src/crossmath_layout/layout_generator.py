@@ -1,11 +1,13 @@
-from typing import Set, Generator
+from typing import Dict, List, Optional, Set, Generator, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import time
 
 from crossmath_layout.placement_generator import PlacementGenerator
-from crossmath_layout.circle_block_count_extractor import CircleBlockCountExtractor, OuterCircleBlockCount
 from crossmath_layout.models import Layout, Placement, Direction, Size
 from crossmath_layout.utils.viewer import print_board
 from crossmath_layout.layout_checker import LayoutChecker
+from crossmath_layout.layout_symmetry import LayoutSymmetry
 from crossmath_layout.utils.time_formatter import TimeFormatter
 from crossmath_layout.utils.dynamic_total_progress import DynamicTotalProgress
 
@@ -15,56 +17,213 @@ class LayoutGenerator:
     """
     盘面生成器
     """
-    def __init__(self, equation_length: int = 5):
+    def __init__(self, equation_length: int = 5, children_cache_size: int = 0):
+        """
+        :param children_cache_size: 按盘面缓存子盘面的 LRU 容量，0 表示不缓存
+            单次 DFS 中每个盘面只展开一次，缓存只在同一生成器多次搜索重叠子树时（如多进程的子树任务）才有收益
+        """
         self.equation_length = equation_length
         self.placement_generator = PlacementGenerator(equation_length=equation_length)
-        self.circle_block_count_extractor = CircleBlockCountExtractor()
         self.layout_checker = LayoutChecker()
+        self.layout_symmetry = LayoutSymmetry()
+
+        # (height, width) -> {placement: 放置该算式后需要置1的格子位掩码}，按尺寸一次性算出所有放置点
+        self._placement_masks: Dict[Tuple[int, int], Dict[Placement, int]] = {}
+        # (height, width) -> 最外圈上、下、左、右四条边的位掩码
+        self._outer_circle_masks: Dict[Tuple[int, int], Tuple[int, int, int, int]] = {}
+        # (bitmask, height, width) -> 所有子盘面的位掩码，按放置点顺序
+        self._cached_child_bitmasks = lru_cache(maxsize=children_cache_size)(self._build_child_bitmasks) if children_cache_size > 0 else None
 
         self.count = 0
         self.pbar = None
 
-    def generate_layout(self, size: Size, progress: bool = False) -> Generator[Layout, None, None]:
+    def generate_layout(self, size: Size, progress: bool = False, dedup_symmetry: bool = False, prune_mirror: bool = False) -> Generator[Layout, None, None]:
+        """
+        生成所有合法盘面
+        :param dedup_symmetry: 按对称变换去重，每类对称等价的盘面只保留首次遇到的一个，并剪掉其重复子树
+        :param prune_mirror: 首行放置点左右对称时只从左半边的放置点开始搜索，每得到一个盘面同时输出它的左右镜像，
+            生成的盘面集合不变，但顺序不同
+        """
         self.count = 0
         placements = self.get_init_placements(size)
-        seen_layouts = set()
+        mirror_yield = False
+        if prune_mirror:
+            mirror_placements = self.get_mirror_init_placements(size, placements)
+            if mirror_placements is not None:
+                placements = mirror_placements
+                # 按对称去重时镜像与原盘面属于同一类，不需要再输出
+                mirror_yield = not dedup_symmetry
+        # 以盘面位掩码（Python 整数，不限位数）为键，比以 layout_info 字符串为键哈希更快、占用更少
+        seen_layouts: Set[int] = set()
         if progress:
             self.pbar = DynamicTotalProgress(desc=f"Generating layout for {size.height}*{size.width}", chunk_size=1000) 
             self.pbar.update(0)
 
         for placement in placements:
-            layout = Layout(layout_info="0" * size.height * size.width, height=size.height, width=size.width)
+            layout = build_empty_layout(size.height, size.width)
             layout = self.apply_placement(layout, placement, check_valid=False)
             before_count = self.count
-            yield from self.iter_dfs_generate_layout(layout, seen_layouts)
+            if mirror_yield:
+                yield from self._iter_with_mirror(self.iter_dfs_generate_layout(layout, seen_layouts, dedup_symmetry), seen_layouts)
+            else:
+                yield from self.iter_dfs_generate_layout(layout, seen_layouts, dedup_symmetry)
             after_count = self.count
             print(f"size: {size.height}*{size.width}, placement: {placement}, update count: {after_count - before_count}, current count: {self.count}")
           
         if progress and self.pbar is not None:
             self.pbar.close()
             self.pbar = None
-    
-    def iter_dfs_generate_layout(self, layout: Layout, seen_layouts: Set[str]) -> Generator[Layout, None, None]:
-        # 检查是否已经处理过 
-        if layout.layout_info in seen_layouts:
-            return
-        seen_layouts.add(layout.layout_info)
-
-        # 检查是否成为合法盘面
-        if self.is_valid_layout(layout):
+
+    def _iter_with_mirror(self, layouts: Generator[Layout, None, None], seen_layouts: Set[int]) -> Generator[Layout, None, None]:
+        """
+        输出盘面及其左右镜像
+        镜像加入已访问集合，DFS 之后不会再从它展开：它的子树就是原盘面子树的镜像，其中的合法盘面都会以镜像的形式输出
+        """
+        mirror = self.layout_symmetry.mirror
+        for layout in layouts:
+            yield layout
+            mirror_bitmask = mirror(layout.bitmask, layout.height, layout.width)
+            if mirror_bitmask in seen_layouts:
+                continue
+            seen_layouts.add(mirror_bitmask)
             self.count += 1
             if self.pbar is not None:
                 self.pbar.update(1)
-            yield layout
-        
-        if not self.placement_generator.setup(layout):
-            return
+            yield Layout(bitmask=mirror_bitmask, height=layout.height, width=layout.width)
+
+    def generate_layout_parallel(self, size: Size, max_workers: Optional[int] = None, split_depth: int = 2, progress: bool = False, dedup_symmetry: bool = False) -> Generator[Layout, None, None]:
+        """
+        多进程生成所有合法盘面
+        各子树的工作量相差悬殊，所以先在主进程中把每个首行放置点的搜索树展开 split_depth 层，
+        再把展开边界上的每个子树作为一个任务提交到进程池，空闲进程会自动领取剩余任务
+        子进程各自维护已访问集合，主进程按放置点顺序汇总并全局去重
+        生成的盘面集合与 generate_layout 相同，但顺序不同
+        :param max_workers: 进程数，默认为 CPU 核数
+        :param split_depth: 主进程展开的层数，越大任务越细、负载越均衡，但主进程串行部分越多
+        """
+        self.count = 0
+        height, width = size.height, size.width
+        placements = self.get_init_placements(size)
+        seen_layouts: Set[int] = set()
+        expanded_layouts: Set[int] = set()
+        canonical = self.layout_symmetry.canonical
+        if progress:
+            self.pbar = DynamicTotalProgress(desc=f"Generating layout for {height}*{width}", chunk_size=1000)
+            self.pbar.update(0)
 
-        # 生成放置点
-        placements = self.placement_generator.generate_placement()
-        for placement in placements:
-            new_layout = self.apply_placement(layout, placement)
-            yield from self.iter_dfs_generate_layout(new_layout, seen_layouts)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # 先把所有放置点展开并提交任务，再按顺序收集结果，保证进程池一开始就有足够多的任务
+            placement_results = []
+            for placement in placements:
+                layout = self.apply_placement(build_empty_layout(height, width), placement)
+                valid_bitmasks, frontier = self._split_subtrees(layout, split_depth, expanded_layouts, dedup_symmetry)
+                futures = [
+                    executor.submit(_dfs_worker, self.equation_length, height, width, bitmask, dedup_symmetry)
+                    for bitmask in frontier
+                ]
+                placement_results.append((placement, valid_bitmasks, futures))
+
+            for placement, valid_bitmasks, futures in placement_results:
+                before_count = self.count
+                for bitmasks in [valid_bitmasks] + [future.result() for future in futures]:
+                    for bitmask in bitmasks:
+                        seen_key = canonical(bitmask, height, width) if dedup_symmetry else bitmask
+                        if seen_key in seen_layouts:
+                            continue
+                        seen_layouts.add(seen_key)
+                        self.count += 1
+                        if self.pbar is not None:
+                            self.pbar.update(1)
+                        yield Layout(bitmask=bitmask, height=height, width=width)
+                print(f"size: {height}*{width}, placement: {placement}, tasks: {len(futures)}, update count: {self.count - before_count}, current count: {self.count}")
+
+        if progress and self.pbar is not None:
+            self.pbar.close()
+            self.pbar = None
+
+    def _split_subtrees(self, layout: Layout, split_depth: int, expanded_layouts: Set[int], dedup_symmetry: bool = False) -> Tuple[List[int], List[int]]:
+        """
+        在主进程中按 DFS 顺序展开 split_depth 层
+        :return: (展开过程中遇到的合法盘面, 第 split_depth 层待提交的子树根盘面)，均为位掩码
+        """
+        valid_bitmasks = []
+        frontier = []
+        stack = [(layout, 0)]
+        while stack:
+            layout, depth = stack.pop()
+            seen_key = self.layout_symmetry.canonical(layout.bitmask, layout.height, layout.width) if dedup_symmetry else layout.bitmask
+            if seen_key in expanded_layouts:
+                continue
+            expanded_layouts.add(seen_key)
+
+            if depth == split_depth:
+                frontier.append(layout.bitmask)
+                continue
+
+            if self.is_valid_layout(layout):
+                valid_bitmasks.append(layout.bitmask)
+
+            if not self.placement_generator.setup(layout):
+                continue
+
+            for placement in reversed(self.placement_generator.generate_placement()):
+                stack.append((self.apply_placement(layout, placement), depth + 1))
+
+        return valid_bitmasks, frontier
+
+    def iter_dfs_generate_layout(self, layout: Layout, seen_layouts: Set[int], dedup_symmetry: bool = False) -> Generator[Layout, None, None]:
+        # 用显式栈代替递归生成器，避免每一层都挂起一个 yield from
+        # 循环内用到的方法提前绑定为局部变量，省去每个节点上的属性查找
+        # 整个搜索的盘面尺寸不变，栈中只保存位掩码，合法性检查直接内联为四次按位与
+        height, width = layout.height, layout.width
+        top_mask, bottom_mask, left_mask, right_mask = self._get_outer_circle_masks(height, width)
+        stack = [layout.bitmask]
+        pop = stack.pop
+        push = stack.append
+        mark_seen = seen_layouts.add
+        placement_masks = self._get_placement_masks(height, width)
+        setup_placement_generator = self.placement_generator.setup
+        generate_placement = self.placement_generator.generate_placement
+        canonical = self.layout_symmetry.canonical
+        cached_child_bitmasks = self._cached_child_bitmasks
+
+        while stack:
+            bitmask = pop()
+            # 检查是否已经处理过，按对称去重时以规范形式为键
+            seen_key = canonical(bitmask, height, width) if dedup_symmetry else bitmask
+            if seen_key in seen_layouts:
+                continue
+            mark_seen(seen_key)
+
+            # 检查是否成为合法盘面：四周都有值
+            layout = None
+            if bitmask & top_mask and bitmask & bottom_mask and bitmask & left_mask and bitmask & right_mask:
+                layout = Layout(bitmask=bitmask, height=height, width=width)
+                self.count += 1
+                if self.pbar is not None:
+                    self.pbar.update(1)
+                yield layout
+
+            if cached_child_bitmasks is not None:
+                child_bitmasks = reversed(cached_child_bitmasks(bitmask, height, width))
+            elif setup_placement_generator(layout or Layout(bitmask=bitmask, height=height, width=width)):
+                # 生成放置点，逆序压栈以保持与递归相同的遍历顺序；合法放置点都在盘面内，必然在掩码表中
+                child_bitmasks = [bitmask | placement_masks[placement] for placement in reversed(generate_placement())]
+            else:
+                continue
+
+            # 压栈前先跳过已处理过的子盘面，省去一次出栈；按对称去重时出栈再检查，避免重复计算规范形式
+            for child_bitmask in child_bitmasks:
+                if not dedup_symmetry and child_bitmask in seen_layouts:
+                    continue
+                push(child_bitmask)
+
+    def _build_child_bitmasks(self, bitmask: int, height: int, width: int) -> Tuple[int, ...]:
+        """计算盘面放置每个合法放置点后的子盘面位掩码"""
+        layout = Layout(bitmask=bitmask, height=height, width=width)
+        if not self.placement_generator.setup(layout):
+            return ()
+        return tuple(self.apply_placement(layout, placement).bitmask for placement in self.placement_generator.generate_placement())
     
     def get_init_placements(self, size: Size):
         # 只生成首行的情况
@@ -86,15 +245,30 @@ class LayoutGenerator:
 
         return placements
 
-    def apply_placement(self, layout: Layout, placement: Placement, check_valid: bool = True):
-        offset = (0, 1) if placement.direction == Direction.HORIZONTAL else (1, 0)
-        set_one_points = [
-            (placement.row + i * offset[0], placement.col + i * offset[1])
-            for i in range(self.equation_length)
-        ]
-        layout_info = list(layout.layout_info)
-        for point in set_one_points:
-            layout_info[point[0] * layout.width + point[1]] = "1"
+    def get_mirror_init_placements(self, size: Size, placements: List[Placement]) -> Optional[List[Placement]]:
+        """
+        首行放置点在左右镜像下封闭时，返回每对镜像中靠左的一个（自身对称的保留）；不封闭时返回 None
+        """
+        def mirror_placement(placement: Placement) -> Placement:
+            length = self.equation_length if placement.direction == Direction.HORIZONTAL else 1
+            return Placement(placement.row, size.width - length - placement.col, placement.direction)
+
+        placement_set = set(placements)
+        if any(mirror_placement(placement) not in placement_set for placement in placements):
+            return None
+        return [placement for placement in placements if placement.col <= mirror_placement(placement).col]
+
+    def apply_placement(self, layout: Layout, placement: Placement, check_valid: bool = False):
+        """
+        放置算式，返回新的盘面
+        :param check_valid: 调试用，放置前重新分析原盘面的交点是否合法，不合法时打印盘面并暂停
+        """
+        # 放置算式即把对应格子的位置1
+        placement_masks = self._get_placement_masks(layout.height, layout.width)
+        placement_mask = placement_masks.get(placement)
+        if placement_mask is None:
+            placement_mask = self._build_placement_mask(layout.height, layout.width, placement)
+            placement_masks[placement] = placement_mask
 
         if check_valid:
             if not self.layout_checker.setup(layout.layout_info, width=layout.width, height=layout.height):
@@ -109,18 +283,79 @@ class LayoutGenerator:
                     print_board(layout.layout_info, width=layout.width, height=layout.height)
                     input("按回车键继续...")
 
-        return Layout(layout_info="".join(layout_info), height=layout.height, width=layout.width)
+        return Layout(bitmask=layout.bitmask | placement_mask, height=layout.height, width=layout.width)
+
+    def _get_placement_masks(self, height: int, width: int) -> Dict[Placement, int]:
+        """获取该尺寸下所有盘面内放置点的位掩码表，按尺寸缓存"""
+        placement_masks = self._placement_masks.get((height, width))
+        if placement_masks is None:
+            placement_masks = {}
+            for row in range(height):
+                for col in range(width):
+                    for direction in (Direction.HORIZONTAL, Direction.VERTICAL):
+                        placement = Placement(row, col, direction)
+                        end_row, end_col = (row, col + self.equation_length - 1) if direction == Direction.HORIZONTAL else (row + self.equation_length - 1, col)
+                        if end_row < height and end_col < width:
+                            placement_masks[placement] = self._build_placement_mask(height, width, placement)
+            self._placement_masks[(height, width)] = placement_masks
+        return placement_masks
+
+    def _build_placement_mask(self, height: int, width: int, placement: Placement) -> int:
+        """计算放置点对应的格子位掩码"""
+        offset = (0, 1) if placement.direction == Direction.HORIZONTAL else (1, 0)
+        set_one_points = [
+            (placement.row + i * offset[0], placement.col + i * offset[1])
+            for i in range(self.equation_length)
+        ]
+        last_bit = height * width - 1
+        placement_mask = 0
+        for point in set_one_points:
+            placement_mask |= 1 << (last_bit - (point[0] * width + point[1]))
+        return placement_mask
 
 
     def is_valid_layout(self, layout: Layout):
-        # 四周都有值
-        outer_circle_block_count: OuterCircleBlockCount = self.circle_block_count_extractor.cal_outer_circle_block_count(layout.layout_info, layout.height, layout.width)
-        return all(count > 0 for count in outer_circle_block_count.to_list())
+        # 四周都有值：每条边的位掩码与盘面相与都不为0
+        top_mask, bottom_mask, left_mask, right_mask = self._get_outer_circle_masks(layout.height, layout.width)
+        bitmask = layout.bitmask
+        return (bitmask & top_mask) != 0 and (bitmask & bottom_mask) != 0 and (bitmask & left_mask) != 0 and (bitmask & right_mask) != 0
+
+    def _get_outer_circle_masks(self, height: int, width: int) -> Tuple[int, int, int, int]:
+        """获取最外圈上、下、左、右四条边的位掩码，按尺寸缓存"""
+        outer_circle_masks = self._outer_circle_masks.get((height, width))
+        if outer_circle_masks is None:
+            # 第 i 个格子对应第 height * width - 1 - i 位：首行在最高位，末行在最低位
+            row_mask = (1 << width) - 1
+            right_mask = sum(1 << (row * width) for row in range(height))
+            outer_circle_masks = (
+                row_mask << ((height - 1) * width),
+                row_mask,
+                right_mask << (width - 1),
+                right_mask,
+            )
+            self._outer_circle_masks[(height, width)] = outer_circle_masks
+        return outer_circle_masks
 
 
 
 def build_empty_layout(height: int, width: int) -> Layout:
-    return Layout(layout_info="0" * height * width, height=height, width=width)
+    return Layout(bitmask=0, height=height, width=width)
+
+
+# 子进程内复用的生成器：equation_length -> LayoutGenerator，保留放置点掩码等缓存
+_worker_generators: Dict[int, LayoutGenerator] = {}
+# 子进程内子盘面缓存的容量：同一进程处理的子树任务之间常有重叠
+_WORKER_CHILDREN_CACHE_SIZE = 1 << 18
+
+
+def _dfs_worker(equation_length: int, height: int, width: int, bitmask: int, dedup_symmetry: bool) -> List[int]:
+    """子进程入口：从给定盘面开始 DFS，返回所有合法盘面的位掩码"""
+    generator = _worker_generators.get(equation_length)
+    if generator is None:
+        generator = LayoutGenerator(equation_length=equation_length, children_cache_size=_WORKER_CHILDREN_CACHE_SIZE)
+        _worker_generators[equation_length] = generator
+    layout = Layout(bitmask=bitmask, height=height, width=width)
+    return [layout.bitmask for layout in generator.iter_dfs_generate_layout(layout, set(), dedup_symmetry)]
 
 
 if __name__ == "__main__":
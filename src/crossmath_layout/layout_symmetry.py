@@ -0,0 +1,92 @@
+"""
+盘面对称变换
+盘面以整数位掩码表示（见 Layout），支持水平翻转、垂直翻转、旋转180度，
+正方形盘面额外支持转置及其组合，共 8 种变换
+"""
+
+from typing import Dict, List, Tuple
+
+
+class LayoutSymmetry:
+    """
+    盘面对称变换器
+    所有变换都按行处理：先把位掩码拆成每行的整数，再用查表翻转行内的位
+    """
+    def __init__(self):
+        # width -> 行内位翻转表
+        self._reverse_tables: Dict[int, List[int]] = {}
+        # (width, height) -> 行内位展开表：把一行的第 c 列放到转置后第 c 行第 0 列
+        self._spread_tables: Dict[Tuple[int, int], List[int]] = {}
+
+    def canonical(self, bitmask: int, height: int, width: int) -> int:
+        """获取盘面在所有对称变换下的规范形式（取最小值）"""
+        return min(self.transforms(bitmask, height, width))
+
+    def transforms(self, bitmask: int, height: int, width: int) -> List[int]:
+        """获取盘面在所有对称变换下的结果（包含自身）"""
+        rows = self._split_rows(bitmask, height, width)
+        results = self._flips(rows, width)
+        if height == width:
+            results.extend(self._flips(self._split_rows(self.transpose(bitmask, height, width), width, height), height))
+        return results
+
+    def mirror(self, bitmask: int, height: int, width: int) -> int:
+        """水平翻转（左右镜像）"""
+        reverse_table = self._get_reverse_table(width)
+        return self._join_rows([reverse_table[row] for row in self._split_rows(bitmask, height, width)], width)
+
+    def transpose(self, bitmask: int, height: int, width: int) -> int:
+        """转置：(row, col) -> (col, row)，结果为 width * height 的盘面"""
+        spread_table = self._get_spread_table(width, height)
+        result = 0
+        for row, row_bits in enumerate(self._split_rows(bitmask, height, width)):
+            result |= spread_table[row_bits] >> row
+        return result
+
+    def _flips(self, rows: List[int], width: int) -> List[int]:
+        """原样、水平翻转、垂直翻转、旋转180度"""
+        reverse_table = self._get_reverse_table(width)
+        mirrored_rows = [reverse_table[row] for row in rows]
+        return [
+            self._join_rows(rows, width),
+            self._join_rows(mirrored_rows, width),
+            self._join_rows(rows[::-1], width),
+            self._join_rows(mirrored_rows[::-1], width),
+        ]
+
+    def _split_rows(self, bitmask: int, height: int, width: int) -> List[int]:
+        """拆分成每行的整数，首行在前；行内第 0 列在最高位"""
+        row_mask = (1 << width) - 1
+        return [(bitmask >> ((height - 1 - row) * width)) & row_mask for row in range(height)]
+
+    def _join_rows(self, rows: List[int], width: int) -> int:
+        """把每行的整数拼回位掩码"""
+        bitmask = 0
+        for row_bits in rows:
+            bitmask = (bitmask << width) | row_bits
+        return bitmask
+
+    def _get_reverse_table(self, width: int) -> List[int]:
+        reverse_table = self._reverse_tables.get(width)
+        if reverse_table is None:
+            reverse_table = [int(format(value, f"0{width}b")[::-1], 2) for value in range(1 << width)]
+            self._reverse_tables[width] = reverse_table
+        return reverse_table
+
+    def _get_spread_table(self, width: int, height: int) -> List[int]:
+        """
+        行内第 c 列（第 width-1-c 位）展开到转置后盘面（width 行 height 列）的 (c, 0)，
+        即第 width * height - 1 - c * height 位；第 r 行的结果再右移 r 位即为 (c, r)
+        """
+        spread_table = self._spread_tables.get((width, height))
+        if spread_table is None:
+            last_bit = width * height - 1
+            spread_table = [0] * (1 << width)
+            for value in range(1 << width):
+                spread = 0
+                for col in range(width):
+                    if value >> (width - 1 - col) & 1:
+                        spread |= 1 << (last_bit - col * height)
+                spread_table[value] = spread
+            self._spread_tables[(width, height)] = spread_table
+        return spread_table
@@ -1,12 +1,13 @@
 import sys
 import os
 import argparse
-from typing import List, Dict
+from typing import List, Dict, Generator, Optional
 import pandas as pd
 from tqdm import tqdm
 from pathlib import Path
 from crossmath_layout.layout_generator import LayoutGenerator
-from crossmath_layout.models import Size
+from crossmath_layout.models import Layout, Size
+from crossmath_layout.utils.layout_cache import LayoutCache
 
 
 class Args:
@@ -27,19 +28,26 @@ class Args:
         return f"Args(height={self.height}, width={self.width}, output_file={self.output_file}, chunk_size={self.chunk_size})"
 
 
-def save_result_list(result_list: List[Dict], output_file: str):
-    """保存结果到文件（支持CSV/Excel）"""
+def new_result_columns() -> Dict[str, List]:
+    """按列收集结果，保存时直接构建 DataFrame，省去逐行字典的开销"""
+    return {"index": [], "layout_info": [], "height": [], "width": []}
+
+
+def save_result_list(result_columns: Dict[str, List], output_file: str):
+    """保存结果到文件（支持CSV/Excel/Parquet，Parquet 需要安装 pyarrow）"""
     file_ext = Path(output_file).suffix.lower()
     
     try:
-        df = pd.DataFrame(result_list)
+        df = pd.DataFrame(result_columns)
         if file_ext == ".csv":
             df.to_csv(output_file, index=False)
         elif file_ext in (".xlsx", ".xls"):
             df.to_excel(output_file, index=False)
+        elif file_ext == ".parquet":
+            df.to_parquet(output_file, index=False)
         else:
             raise ValueError(f"Unsupported file format: {file_ext}")
-        print(f"Successfully saved {len(result_list)} records to {output_file}")
+        print(f"Successfully saved {len(df)} records to {output_file}")
     except Exception as e:
         print(f"Error saving file {output_file}: {str(e)}")
         raise
@@ -59,12 +67,46 @@ def parse_args():
     parser = argparse.ArgumentParser(description="Generate crossmath layouts")
     parser.add_argument("-H", "--height", type=int, required=True, help="Grid height")
     parser.add_argument("-W", "--width", type=int, required=True, help="Grid width")
-    parser.add_argument("-o", "--output", required=True, help="Output file path (.csv or .xlsx)")
+    parser.add_argument("-o", "--output", required=True, help="Output file path (.csv, .xlsx or .parquet)")
     parser.add_argument("-s", "--chunk-size", type=int, default=50000, 
                        help="Number of records per file chunk (default: 1000)")
+    parser.add_argument("--dedup-symmetry", action="store_true",
+                       help="Keep only one layout per symmetry class (flips/rotations)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                       help="Number of worker processes (default: 1, run in the current process)")
+    parser.add_argument("--cache-dir", default=None,
+                       help="Directory for cached generation results; reused on later runs of the same size")
+    parser.add_argument("--prune-mirror", action="store_true",
+                       help="Search only the left half of mirror-symmetric start placements and emit mirrors (single process only)")
     return parser.parse_args()
 
 
+def iter_layouts(generator: LayoutGenerator, size: Size, workers: int = 1, dedup_symmetry: bool = False,
+                 layout_cache: Optional[LayoutCache] = None, prune_mirror: bool = False) -> Generator[Layout, None, None]:
+    """生成盘面：有缓存时直接读取缓存，否则执行 DFS，完整生成后写入缓存"""
+    cache_key = (size.height, size.width, generator.equation_length, dedup_symmetry)
+    if layout_cache is not None and layout_cache.exists(*cache_key):
+        print(f"Loading layouts from cache: {layout_cache.get_path(*cache_key)}")
+        for bitmask in layout_cache.iter_bitmasks(*cache_key):
+            yield Layout(bitmask=bitmask, height=size.height, width=size.width)
+        return
+
+    if workers > 1:
+        layouts = generator.generate_layout_parallel(size, max_workers=workers, dedup_symmetry=dedup_symmetry)
+    else:
+        layouts = generator.generate_layout(size, dedup_symmetry=dedup_symmetry, prune_mirror=prune_mirror)
+
+    bitmasks = []
+    for layout in layouts:
+        bitmasks.append(layout.bitmask)
+        yield layout
+
+    # 只有完整生成才写入缓存
+    if layout_cache is not None:
+        cache_path = layout_cache.save(bitmasks, *cache_key)
+        print(f"Saved {len(bitmasks)} layouts to cache: {cache_path}")
+
+
 def main():
     # 解析命令行参数
     args = parse_args()
@@ -82,7 +124,11 @@ def main():
     size = Size(height=params.height, width=params.width)
     
     # 结果收集
-    result_list = []
+    result_columns = new_result_columns()
+    index_column = result_columns["index"]
+    layout_info_column = result_columns["layout_info"]
+    height_column = result_columns["height"]
+    width_column = result_columns["width"]
     chunk_index = 0
     
     # 进度条配置
@@ -93,20 +139,23 @@ def main():
         dynamic_ncols=True
     )
 
+    layout_cache = LayoutCache(args.cache_dir) if args.cache_dir else None
+    layouts = iter_layouts(generator, size, workers=args.workers, dedup_symmetry=args.dedup_symmetry,
+                           layout_cache=layout_cache, prune_mirror=args.prune_mirror)
+
     try:
-        for index, layout in enumerate(generator.generate_layout(size), start=1):
-            result_list.append({
-                "index": index,
-                "layout_info": layout.layout_info,
-                "height": layout.height,
-                "width": layout.width
-            })
+        for index, layout in enumerate(layouts, start=1):
+            index_column.append(index)
+            layout_info_column.append(layout.layout_info)
+            height_column.append(layout.height)
+            width_column.append(layout.width)
 
             # 分块保存
             if index % params.chunk_size == 0:
                 output_path = build_file_name(params.output_file, chunk_index)
-                save_result_list(result_list, output_path)
-                result_list = []
+                save_result_list(result_columns, output_path)
+                for column in result_columns.values():
+                    column.clear()
                 chunk_index += 1
             
             pbar.update(1)
@@ -114,9 +163,9 @@ def main():
 
     finally:
         # 保存剩余数据
-        if result_list:
+        if index_column:
             output_path = params.output_file if chunk_index == 0 else build_file_name(params.output_file, chunk_index)
-            save_result_list(result_list, output_path)
+            save_result_list(result_columns, output_path)
         
         pbar.close()
 
@@ -1,5 +1,5 @@
 
-from enum import Enum
+from enum import IntEnum
 from typing import NamedTuple, Tuple
 
 from dataclasses import dataclass, field
@@ -20,11 +20,7 @@ class Size(NamedTuple):
     def from_tuple(self, tuple: Tuple[int, int]):
         return Size(tuple[0], tuple[1])
 
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, Size):
-            return False
-        return self.height == other.height and self.width == other.width
-
+    # 不重写 __eq__: 沿用 tuple 在 C 层的比较与哈希
     def __repr__(self):
         return f"Size(height={self.height}, width={self.width})"
 
@@ -40,24 +36,28 @@ class RowCol(NamedTuple):
 
     def from_tuple(self, tuple: Tuple[int, int]):
         return RowCol(tuple[0], tuple[1])
-    
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, RowCol):
-            return False
-        return self.row == other.row and self.col == other.col
 
+    # 不重写 __eq__: 坐标大量用作 dict/set 的键, 沿用 tuple 在 C 层的比较与哈希
     def __repr__(self):
         return f"RowCol(row={self.row}, col={self.col})"
 
-class Direction(Enum):
+class Direction(IntEnum):
     """
     方向
+    取整数值, 放置点作为 dict 键时按 int 在 C 层比较与哈希
     """
-    HORIZONTAL = "horizontal"
-    VERTICAL = "vertical"
+    HORIZONTAL = 0
+    VERTICAL = 1
 
     def __repr__(self):
-        return self.value 
+        return self.name.lower()
+
+    def __str__(self):
+        return f"Direction.{self.name}"
+
+    def __format__(self, format_spec: str) -> str:
+        # IntEnum 默认按整数格式化, 这里保持日志中的 Direction.HORIZONTAL 形式
+        return str(self).__format__(format_spec)
     
     def reverse(self):
         """返回相反方向"""
@@ -80,17 +80,13 @@ class Placement(NamedTuple):
     def from_RowCol(self, rowCol: RowCol, direction: Direction):
         return Placement(rowCol.row, rowCol.col, direction)
 
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, Placement):
-            return False
-        return self.row == other.row and self.col == other.col and self.direction == other.direction
-
+    # 不重写 __eq__: 放置点大量用作缓存的键, 沿用 tuple 在 C 层的比较与哈希
     def __repr__(self):
         return f"Placement(row={self.row}, col={self.col}, direction={self.direction})"
 
 
 
-@dataclass
+@dataclass(slots=True)
 class EquationLayoutBrief:
     """算式布局简要信息"""
     layout_info: str
@@ -104,26 +100,40 @@ class EquationLayoutBrief:
     )
     """坐标到算式ID集合的映射"""
     
-    equation_id_to_coords: Dict[int, Set[RowCol]] = field(
-        default_factory=lambda: defaultdict(set)
+    equation_id_to_coords: Dict[int, Tuple[RowCol, ...]] = field(
+        default_factory=dict
     )
-    """算式ID到坐标集合的映射"""
+    """算式ID到坐标的映射, 坐标按从首到尾的顺序排列"""
 
     all_valid_coords: List[RowCol] = field(
         default_factory=lambda: []
     )
     """所有有效坐标"""
 
-@dataclass
-class Layout:
+class Layout(NamedTuple):
     """
     盘面信息
+    以整数位掩码保存, 第 i 个格子（行优先）对应第 height * width - 1 - i 位,
+    即 layout_info 按二进制读出的整数
+    DFS 中每个节点都会新建一个盘面, 用 NamedTuple 省去实例 __dict__ 的开销
     """
-    layout_info: str
+    bitmask: int
     height: int
     width: int
 
-@dataclass
+    @property
+    def layout_info(self) -> str:
+        """01 字符串形式的盘面信息"""
+        return format(self.bitmask, f"0{self.height * self.width}b")
+
+    @staticmethod
+    def from_layout_info(layout_info: str, height: int, width: int) -> "Layout":
+        """根据 01 字符串构建盘面；外部数据在这里校验长度，之后的盘面位掩码都不会超出 height * width 位"""
+        if len(layout_info) != height * width:
+            raise ValueError(f"layout_info length {len(layout_info)} does not match {height}x{width}")
+        return Layout(bitmask=int(layout_info, 2), height=height, width=width)
+
+@dataclass(slots=True)
 class LayoutBrief:
     """
     盘面简要信息
@@ -2,12 +2,43 @@
 盘面放置点生成器
 """
 
-from typing import List, Tuple
+from itertools import chain
+from typing import Dict, List, Optional, Set, Tuple
 from crossmath_layout.models import Placement, Layout, RowCol, Direction
 from crossmath_layout.layout_checker import LayoutChecker
 from crossmath_layout.equation_layout_builder import EquationLayoutBriefBuilder
 from crossmath_layout.utils.viewer import print_board
 
+
+_VALID_CROSS_OFFSET_MASK = (1 << 0) | (1 << 2) | (1 << 4)
+"""焦点在算式中允许的偏移（0、2、4）的位掩码"""
+
+_REVERSE = {Direction.HORIZONTAL: Direction.VERTICAL, Direction.VERTICAL: Direction.HORIZONTAL}
+"""方向 -> 相反方向，省去 Direction.reverse 的方法调用"""
+
+_HORIZONTAL_EQUATION_OFFSETS = (
+    (0, 0),  (0, 2), (0, 4),
+    (-2, 0), (-2, 2), (-2, 4),
+    (-4, 0), (-4, 2), (-4, 4),
+)
+"""与横向算式相交的竖向放置点，相对算式起点的 (row, col) 偏移"""
+
+_VERTICAL_EQUATION_OFFSETS = (
+    (0, 0), (0, -2), (0, -4),
+    (2, 0), (2, -2), (2, -4),
+    (4, 0), (4, -2), (4, -4),
+)
+"""与竖向算式相交的横向放置点，相对算式起点的 (row, col) 偏移"""
+
+
+def _mask_allows(board: int, check_mask: Optional[Tuple[int, int]]) -> bool:
+    """盘面是否满足放置点的 (blocked, allowed) 校验掩码：blocked 的格子都为空且至少有一个焦点；None 表示算式越界"""
+    if check_mask is None:
+        return False
+    blocked, allowed = check_mask
+    return not board & blocked and board & allowed != 0
+
+
 class PlacementGenerator:
     """
     盘面放置点生成器
@@ -20,10 +51,24 @@ class PlacementGenerator:
         self.equation_layout_brief = None
 
         self.layout_checker = LayoutChecker()
+        # 焦点在算式中允许的偏移
+        self._valid_cross_offsets = frozenset(i for i in range(equation_length) if (_VALID_CROSS_OFFSET_MASK >> i) & 1)
+        # 算式方向 -> 与之相交的放置点相对算式起点的偏移
+        self._possible_cell_offsets = {
+            Direction.HORIZONTAL: _HORIZONTAL_EQUATION_OFFSETS,
+            Direction.VERTICAL: _VERTICAL_EQUATION_OFFSETS,
+        }
+        # (height, width) -> 横向、纵向放置点的校验掩码表，见 _build_check_masks
+        self._check_masks: Dict[Tuple[int, int], Tuple[List[Optional[Tuple[int, int]]], List[Optional[Tuple[int, int]]]]] = {}
         self.board = None 
+        self._last_bit = None
+        self._horizontal_check_masks = None
+        self._vertical_check_masks = None
         self.layout = None
         self.width = None
         self.height = None
+        # 当前盘面上所有算式的 (起点, 方向)，setup 时算好
+        self._equation_starts: List[Tuple[RowCol, Direction]] = []
 
         self.is_setup = False
 
@@ -31,17 +76,20 @@ class PlacementGenerator:
     def clear(self):
         self.equation_layout_brief = None
         self.board = None
+        self._last_bit = None
+        self._horizontal_check_masks = None
+        self._vertical_check_masks = None
         self.layout = None
         self.width = None
         self.height = None
+        self._equation_starts = []
         self.is_setup = False
 
     def setup(self, layout: Layout):
         self.clear()
 
-        if len(layout.layout_info) != (layout.height * layout.width):
-            # print("Invalid layout")
-            return False
+        # 盘面在 Layout.from_layout_info 中已校验长度，这里只在调试时确认位掩码不超出盘面
+        assert 0 <= layout.bitmask < (1 << (layout.height * layout.width)), "Invalid layout"
         self.layout = layout
         self.build_board(layout)
 
@@ -50,6 +98,7 @@ class PlacementGenerator:
             # print("Invalid layout")
             return False
         
+        self._equation_starts = self._compute_equation_starts()
         self.is_setup = True
         return True
 
@@ -58,14 +107,33 @@ class PlacementGenerator:
             # print("Not setup")
             return []
     
-        # 获取所有的放置点，然后判断是否合法
+        # 获取所有的放置点，然后判断是否合法；逐个算式收集后按顺序拼接
+        # 相邻算式会给出相同的放置点，只保留第一次出现的，重复的不再校验
+        seen: Set[Tuple[int, int, Direction]] = set()
+        return list(chain.from_iterable(self._placements_for_start(equation_start, seen) for equation_start in self._equation_starts))
+
+    def _placements_for_start(self, equation_start: Tuple[RowCol, Direction], seen: Set[Tuple[int, int, Direction]]) -> List[Placement]:
+        """
+        与一个算式相交、且未在 seen 中出现过的合法放置点；校验全程使用整数行列，只为合法的放置点创建 Placement
+        候选起点都在盘面内，直接查掩码表，与 _is_valid_placement 共用 _mask_allows
+        """
+        (start_row, start_col), direction = equation_start
+        placement_direction = _REVERSE[direction]
+        board = self.board
+        width = self.width
+        if placement_direction is Direction.HORIZONTAL:
+            check_masks = self._horizontal_check_masks
+        else:
+            check_masks = self._vertical_check_masks
+
         placements = []
-        for equation_start_rowcol, direction in self.get_all_equation_start_rowcol_and_direction():
-            # print(equation_start_rowcol, direction)
-            for placement in self.get_equation_possible_placements(equation_start_rowcol, direction):
-                # print(placement)
-                if self.is_valid_placement(placement):
-                    placements.append(placement)
+        for row, col in self.get_equation_possible_cells(start_row, start_col, direction):
+            key = (row, col, placement_direction)
+            if key in seen:
+                continue
+            seen.add(key)
+            if _mask_allows(board, check_masks[row * width + col]):
+                placements.append(Placement(row, col, placement_direction))
         return placements
     
     def generate_placement_iter(self, layout: Layout):
@@ -73,141 +141,188 @@ class PlacementGenerator:
             raise ValueError("Board not built")
 
     def build_board(self, layout: Layout):
-        self.board = [
-            [int(layout.layout_info[row * layout.width + col]) for col in range(layout.width)] 
-            for row in range(layout.height)
-        ]
+        # 盘面即 Layout 的位掩码：(row, col) 对应下标 index = row * width + col，在第 _last_bit - index 位
+        self.board = layout.bitmask
         self.width = layout.width
         self.height = layout.height
+        self._last_bit = layout.height * layout.width - 1
+        self._horizontal_check_masks, self._vertical_check_masks = self._get_check_masks(layout.height, layout.width)
+
+    def _get_check_masks(self, height: int, width: int) -> Tuple[List[Optional[Tuple[int, int]]], List[Optional[Tuple[int, int]]]]:
+        check_masks = self._check_masks.get((height, width))
+        if check_masks is None:
+            check_masks = (
+                self._build_check_masks(height, width, Direction.HORIZONTAL),
+                self._build_check_masks(height, width, Direction.VERTICAL),
+            )
+            self._check_masks[(height, width)] = check_masks
+        return check_masks
+
+    def _build_check_masks(self, height: int, width: int, direction: Direction) -> List[Optional[Tuple[int, int]]]:
+        """
+        按起点下标 row * width + col 排列的 (blocked, allowed) 掩码，算式越界的起点为 None
+        blocked: 必须为空的格子，即盘面内的首尾相邻格与不允许出现焦点的格子
+        allowed: 允许出现焦点的格子，至多三个，所以焦点数量上限无需另外检查
+        """
+        last_bit = height * width - 1
+        step = 1 if direction is Direction.HORIZONTAL else width
+        check_masks = []
+        for row in range(height):
+            for col in range(width):
+                end_row, end_col = self._get_end_cell(row, col, direction)
+                if end_row >= height or end_col >= width:
+                    check_masks.append(None)
+                    continue
+
+                start = row * width + col
+                end = start + (self.equation_length - 1) * step
+                if direction is Direction.HORIZONTAL:
+                    has_before, has_after = col != 0, end_col != width - 1
+                else:
+                    has_before, has_after = row != 0, end_row != height - 1
+
+                blocked = allowed = 0
+                if has_before:
+                    blocked |= 1 << (last_bit - start + step)
+                if has_after:
+                    blocked |= 1 << (last_bit - end - step)
+                for offset in range(self.equation_length):
+                    if offset in self._valid_cross_offsets:
+                        allowed |= 1 << (last_bit - start - offset * step)
+                    else:
+                        blocked |= 1 << (last_bit - start - offset * step)
+                check_masks.append((blocked, allowed))
+        return check_masks
+
+    def _get_cell(self, index: int) -> int:
+        return (self.board >> (self._last_bit - index)) & 1
 
     
     def is_valid_row_col(self, rowCol: RowCol):
-        return 0 <= rowCol.row < self.height and 0 <= rowCol.col < self.width 
+        return self.is_valid_cell(rowCol.row, rowCol.col)
+
+    def is_valid_cell(self, row: int, col: int) -> bool:
+        return 0 <= row < self.height and 0 <= col < self.width
 
     def is_valid_placement(self, placement: Placement):
-        # 1. 位置不越界  
-        start_rowcol = RowCol(placement.row, placement.col)
-        end_rowcol = self.get_end_rowcol(placement)
-        if not self.is_valid_row_col(start_rowcol) or not self.is_valid_row_col(end_rowcol):
-            # print("Invalid rowcol")
-            return False
-        
-        # 2. 首位不与其他算式挨着
-        if not self.check_first_and_last_edge(start_rowcol, end_rowcol, placement.direction):
-            # print("Invalid first and last edge")
-            return False
-        
-        # 3. 检查焦点位置是否合法
-        if not self.check_cross_point(placement):
-            # print("Invalid cross point")
+        return self._is_valid_placement(placement.row, placement.col, placement.direction)
+
+    def _is_valid_placement(self, row: int, col: int, direction: Direction) -> bool:
+        """在一次调用中完成越界、首尾相邻、焦点三项检查，与 check_first_and_last_edge、check_cross_point 的结果一致"""
+        width = self.width
+        # 1. 位置不越界：起点在盘面外直接返回，终点越界的起点在掩码表中为 None
+        if row < 0 or col < 0 or row >= self.height or col >= width:
             return False
-        return True
+        if direction is Direction.HORIZONTAL:
+            check_mask = self._horizontal_check_masks[row * width + col]
+        else:
+            check_mask = self._vertical_check_masks[row * width + col]
+
+        # 2. 首尾相邻格与不允许的焦点位置都为空；3. 至少有一个焦点
+        return _mask_allows(self.board, check_mask)
 
     def get_end_rowcol(self, placement: Placement):
-        offset = (0, 0)
-        if placement.direction == Direction.HORIZONTAL:
-            offset = (0, self.equation_length - 1)
-        elif placement.direction == Direction.VERTICAL:
-            offset = (self.equation_length - 1, 0)
+        return RowCol(*self._get_end_cell(placement.row, placement.col, placement.direction))
+
+    def _get_end_cell(self, row: int, col: int, direction: Direction) -> Tuple[int, int]:
+        if direction is Direction.HORIZONTAL:
+            return row, col + self.equation_length - 1
+        elif direction is Direction.VERTICAL:
+            return row + self.equation_length - 1, col
         else:
             raise ValueError("Invalid direction")
-        return RowCol(placement.row + offset[0], placement.col + offset[1])
 
     def check_first_and_last_edge(self, start_rowcol: RowCol, end_rowcol: RowCol, direction: Direction):
+        return self._check_first_and_last_edge(start_rowcol.row, start_rowcol.col, end_rowcol.row, end_rowcol.col, direction)
+
+    def _check_first_and_last_edge(self, start_row: int, start_col: int, end_row: int, end_col: int, direction: Direction) -> bool:
         # 检查首位边界是否与其他算式挨着
-        if direction == Direction.HORIZONTAL:
-            if start_rowcol.col != 0 and self.board[start_rowcol.row][start_rowcol.col - 1] != 0:
+        if direction is Direction.HORIZONTAL:
+            if start_col != 0 and self._get_cell(start_row * self.width + start_col - 1) != 0:
                 return False
-            if end_rowcol.col != self.width - 1 and self.board[end_rowcol.row][end_rowcol.col + 1] != 0:
+            if end_col != self.width - 1 and self._get_cell(end_row * self.width + end_col + 1) != 0:
                 return False
-        elif direction == Direction.VERTICAL:
-            if start_rowcol.row != 0 and self.board[start_rowcol.row - 1][start_rowcol.col] != 0:
+        elif direction is Direction.VERTICAL:
+            if start_row != 0 and self._get_cell((start_row - 1) * self.width + start_col) != 0:
                 return False
-            if end_rowcol.row != self.height - 1 and self.board[end_rowcol.row + 1][end_rowcol.col] != 0:
+            if end_row != self.height - 1 and self._get_cell((end_row + 1) * self.width + end_col) != 0:
                 return False
         return True
         
     def check_cross_point(self, placement: Placement):
-        start_rowcol = RowCol(placement.row, placement.col)
-        direction = placement.direction
-        # 收集焦点位置，判断是否合法
-        cross_points = []
-        offset = (0, 1) if direction == Direction.HORIZONTAL else (1, 0)
-        for i in range(self.equation_length):
-            cur_rowcol = RowCol(start_rowcol.row + i * offset[0], start_rowcol.col + i * offset[1])
-            if not self.is_valid_row_col(cur_rowcol): # 位置越界，直接返回False
-                # print(f"rowcol overflow: {cur_rowcol}")
-                return False
+        return self._check_cross_point(placement.row, placement.col, placement.direction)
 
-            if self.board[cur_rowcol.row][cur_rowcol.col] != 0:
-                cross_points.append(cur_rowcol)
+    def _check_cross_point(self, row: int, col: int, direction: Direction) -> bool:
+        end_row, end_col = self._get_end_cell(row, col, direction)
+        if not self.is_valid_cell(row, col) or not self.is_valid_cell(end_row, end_col): # 位置越界，直接返回False
+            return False
+
+        # 算式经过的格子下标是等差数列：横向步长 1，纵向步长 width
+        step = 1 if direction is Direction.HORIZONTAL else self.width
+        start = row * self.width + col
+
+        # 收集焦点在算式中的偏移，判断是否合法
+        cross_offsets = [i for i in range(self.equation_length) if self._get_cell(start + i * step) != 0]
        
         # 盘面焦点的数量, 至少一个，至多三个
-        cross_count = len(cross_points)
+        cross_count = len(cross_offsets)
         if cross_count < 1 or cross_count > 3:
             # print(f"cross count error: {cross_count}")
             return False
 
-        # 焦点的位置 
-        real_cross_point_ofsets = [
-            (cross_point.row - start_rowcol.row, cross_point.col - start_rowcol.col)
-            for cross_point in cross_points
-        ]
-        valid_cross_point_offsets = [(0, 0), (0, 2), (0, 4)] if direction == Direction.HORIZONTAL else [(0, 0), (2, 0), (4, 0)]
-        
-        if len(set(real_cross_point_ofsets) - set(valid_cross_point_offsets)) != 0: # 存在不合法的焦点位置
-            # print(f"Invalid cross point offsets: {real_cross_point_ofsets} - {valid_cross_point_offsets}")
-            return False  
+        # 焦点的位置：每个偏移都必须是允许的偏移
+        valid_cross_offsets = self._valid_cross_offsets
+        for offset in cross_offsets:
+            if offset not in valid_cross_offsets: # 存在不合法的焦点位置
+                # print(f"Invalid cross point offsets: {cross_offsets}")
+                return False  
         return True
        
     def get_equation_possible_placements(self, equation_start_rowcol: RowCol, direction: Direction):
-        if direction == Direction.HORIZONTAL:
-            possible_rowcol_offset = [
-                (0, 0),  (0, 2), (0, 4),
-                (-2, 0), (-2, 2), (-2, 4),
-                (-4, 0), (-4, 2), (-4, 4),
-            ]
-        elif direction == Direction.VERTICAL:
-            possible_rowcol_offset = [
-                (0, 0), (0, -2), (0, -4),
-                (2, 0), (2, -2), (2, -4),
-                (4, 0), (4, -2), (4, -4),
-            ]
-        else:
+        # # print(real_valid_rowcol, direction.reverse())
+        placement_direction = _REVERSE[direction]
+        return [
+            Placement(row, col, placement_direction)
+            for row, col in self.get_equation_possible_cells(equation_start_rowcol.row, equation_start_rowcol.col, direction)
+        ]
+
+    def get_equation_possible_cells(self, start_row: int, start_col: int, direction: Direction) -> List[Tuple[int, int]]:
+        """与算式相交的放置点中在盘面内的 (row, col)，放置方向与算式方向相反"""
+        possible_rowcol_offset = self._possible_cell_offsets.get(direction)
+        if possible_rowcol_offset is None:
             raise ValueError("Invalid direction")
 
-        real_valid_rowcol = []
-        for rowcol_offset in possible_rowcol_offset:
-            new_rowcol = RowCol(equation_start_rowcol.row + rowcol_offset[0], equation_start_rowcol.col + rowcol_offset[1])
-            if self.is_valid_row_col(new_rowcol):
-                real_valid_rowcol.append(new_rowcol)
-        
-        # # print(real_valid_rowcol, direction.reverse())
-        return [Placement(rowcol.row, rowcol.col, direction.reverse()) for rowcol in real_valid_rowcol]
+        height, width = self.height, self.width
+        return [
+            (start_row + row_offset, start_col + col_offset)
+            for row_offset, col_offset in possible_rowcol_offset
+            if 0 <= start_row + row_offset < height and 0 <= start_col + col_offset < width
+        ]
 
     def get_all_equation_start_rowcol_and_direction(self) -> List[Tuple[RowCol, Direction]]:
         if not self.is_setup:
             # print("Not setup")
             raise ValueError("Not setup")
             # return []
-        
-        def get_equation_direction(coords: List[RowCol]) -> Direction:
-            if coords[0].row == coords[1].row:
-                return Direction.HORIZONTAL
-            elif coords[0].col == coords[1].col:
-                return Direction.VERTICAL
-            else:
-                raise ValueError("Invalid coords")
-        
+        return self._equation_starts
+
+    def _compute_equation_starts(self) -> List[Tuple[RowCol, Direction]]:
+        """计算所有算式的 (起点, 方向)：坐标由 equation_layout_builder 按从首到尾排列，首个坐标即为起点，无需排序"""
         equation_start_rowcol_and_direction = []
         for coords in self.equation_layout_brief.equation_id_to_coords.values():
-            sorted_coords = sorted(coords, key=lambda x: (x.row, x.col))
-            equation_start_rowcol_and_direction.append((sorted_coords[0], get_equation_direction(sorted_coords)))
+            first, second = coords[0], coords[1]
+            if first.row == second.row:
+                direction = Direction.HORIZONTAL
+            elif first.col == second.col:
+                direction = Direction.VERTICAL
+            else:
+                raise ValueError("Invalid coords")
+            equation_start_rowcol_and_direction.append((first, direction))
         return equation_start_rowcol_and_direction
         
 
 if __name__ == "__main__":
-    layout = Layout(layout_info="111110000101010000101011111101010000111110000000000000000000000000000000000000000000000000000000000", height=11, width=9)
+    layout = Layout.from_layout_info("111110000101010000101011111101010000111110000000000000000000000000000000000000000000000000000000000", height=11, width=9)
     print_board(layout.layout_info, layout.width, layout.height)
     placement_generator = PlacementGenerator()
     print(placement_generator.setup(layout))
@@ -20,16 +20,17 @@ class DynamicTotalProgress:
     def update(self, n=1):
         self.current += n
         
-        # 达到当前chunk边界时扩展total
+        # 达到当前chunk边界时扩展total，一次扩展到超过 current 的下一个边界（n 很大时也只设置一次）
         if self.current >= self.total:
-            self.total += self.chunk_size
+            self.total = (self.current // self.chunk_size + 1) * self.chunk_size
             self.pbar.total = self.total
         
         self.pbar.update(n)
     
     def close(self):
-        # 修正最终总数
-        self.pbar.total = self.current
-        self.pbar.refresh()
+        # 修正最终总数，已经一致时不再重绘
+        if self.pbar.total != self.current:
+            self.pbar.total = self.current
+            self.pbar.refresh()
         self.pbar.close()
         return self.current
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+from typing import Generator, Iterable
+
+
+class LayoutCache:
+    """
+    盘面生成结果的磁盘缓存
+    同一尺寸的生成结果是确定的，首次完整生成后把所有盘面的位掩码写入文件，之后直接读取，省去整个 DFS
+    文件为定长记录：每个盘面占 ceil(height * width / 8) 字节，大端序，按生成顺序排列
+    """
+    CHUNK_RECORDS = 4096
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+
+    def get_path(self, height: int, width: int, equation_length: int = 5, dedup_symmetry: bool = False) -> Path:
+        suffix = "_sym" if dedup_symmetry else ""
+        return self.cache_dir / f"layouts_{height}x{width}_L{equation_length}{suffix}.bin"
+
+    def exists(self, height: int, width: int, equation_length: int = 5, dedup_symmetry: bool = False) -> bool:
+        return self.get_path(height, width, equation_length, dedup_symmetry).is_file()
+
+    def iter_bitmasks(self, height: int, width: int, equation_length: int = 5, dedup_symmetry: bool = False) -> Generator[int, None, None]:
+        """按生成顺序逐个读取缓存中的盘面位掩码"""
+        path = self.get_path(height, width, equation_length, dedup_symmetry)
+        record_size = get_record_size(height, width)
+        if path.stat().st_size % record_size != 0:
+            raise ValueError(f"Corrupted layout cache: {path}")
+
+        from_bytes = int.from_bytes
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(record_size * self.CHUNK_RECORDS)
+                if not chunk:
+                    break
+                for start in range(0, len(chunk), record_size):
+                    yield from_bytes(chunk[start:start + record_size], "big")
+
+    def save(self, bitmasks: Iterable[int], height: int, width: int, equation_length: int = 5, dedup_symmetry: bool = False) -> Path:
+        """写入缓存：先写临时文件再替换，中途失败不会留下不完整的缓存"""
+        path = self.get_path(height, width, equation_length, dedup_symmetry)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record_size = get_record_size(height, width)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(bitmask.to_bytes(record_size, "big") for bitmask in bitmasks))
+        os.replace(tmp_path, path)
+        return path
+
+
+def get_record_size(height: int, width: int) -> int:
+    """每个盘面占用的字节数"""
+    return (height * width + 7) // 8
@@ -1,11 +1,12 @@
+_UNITS = ((3600, "h"), (60, "m"), (1, "s"))
+"""(单位秒数, 后缀)，从大到小排列，最后一项兜底"""
+
+
 class TimeFormatter:
     """时间格式化类"""
-    
+
     @staticmethod
     def format(elapsed_time: float, digits: int = 2) -> str:
-        if elapsed_time < 60:
-            return f"{elapsed_time:.{digits}f}s"
-        elif elapsed_time < 3600:
-            return f"{elapsed_time / 60:.{digits}f}m"
-        else:
-            return f"{elapsed_time / 3600:.{digits}f}h"
+        for seconds, suffix in _UNITS:
+            if elapsed_time >= seconds or seconds == 1:
+                return f"{elapsed_time / seconds:.{digits}f}{suffix}"
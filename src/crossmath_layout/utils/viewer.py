@@ -1,30 +1,18 @@
-import pandas
+_CELL_CHARS = str.maketrans({"0": " ", "1": "■"})
+"""
+盘面字符到显示字符的转换表
+ "■" : "□"
+"""
+
 
 def print_board(layout_info: str, width: int, height: int):
-    pandas.set_option("display.max_rows", None)
-    pandas.set_option("display.max_columns", None)
-    pandas.set_option("display.width", 2000)
+    """按行列打印盘面：有格子的位置显示 ■，首行为列号，首列为行号"""
+    index_width = len(str(height - 1))
+    col_widths = [len(str(col)) for col in range(width)]
+    cells = layout_info.translate(_CELL_CHARS)
 
-    board = [
-        [int(layout_info[y * width + x]) for x in range(width)]
-        for y in range(height)
-    ]
-    """
-     "■" : "□"
-    """
-    temp_map = [
-        [" " for _ in range(width)] for _ in range(height)
-    ]
+    lines = [" " * index_width + "".join(f"  {col}" for col in range(width))]
     for row in range(height):
-        for col in range(width):
-            value = board[row][col]
-            if value == 0:
-                temp_map[row][col] = " "
-            else:
-                temp_map[row][col] = "■"
-
-    df = pandas.DataFrame(temp_map)
-    print(df)
-    pandas.reset_option("display.max_rows")
-    pandas.reset_option("display.max_columns")
-    pandas.reset_option("display.width")
\ No newline at end of file
+        row_cells = cells[row * width:(row + 1) * width]
+        lines.append(f"{row:<{index_width}}" + "".join(f"  {cell:>{col_width}}" for cell, col_width in zip(row_cells, col_widths)))
+    print("\n".join(lines))